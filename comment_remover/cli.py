@@ -5,13 +5,45 @@ This module provides the command-line interface for the comment remover tool.
 """
 
 import argparse
+import contextlib
+import io
+import multiprocessing
 import os
-import time
+import shutil
+import sys
+import tempfile
 from pathlib import Path
 
 from .core import process_comments, detect_file_type, COMMENT_PATTERNS
 
 
+# Compiled Python files share the extension lookup with Python source, but
+# are never walked into or processed as text
+_SKIPPED_DIRS = frozenset(('__pycache__',))
+_BINARY_EXTENSIONS = frozenset(('.pyc', '.pyo', '.pyd'))
+
+
+def _read_source(input_path):
+    """
+    Read a source file as undecoded bytes.
+    
+    Comments are removed from the bytes directly, so the file is never
+    decoded into a str.
+    
+    Args:
+        input_path (str): Path to the file to read.
+        
+    Returns:
+        bytes: The content, with universal newlines like text mode.
+    """
+    with open(input_path, 'rb') as f_in:
+        content = f_in.read()
+    
+    if b'\r' in content:
+        content = content.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    return content
+
+
 def main():
     """
     Main entry point for the command-line interface.
@@ -23,13 +55,19 @@ def main():
         description='Process comments in any file: remove multi-line comments, '
                     'strip trailing single-line comments, replace full-line single comments with blank lines.'
     )
-    parser.add_argument('input_file', nargs='?', help='Path to the input file.')
-    parser.add_argument('-o', '--output', help='Path to the output file. If not provided, prints to console.')
+    parser.add_argument('input_file', nargs='?', help='Path to the input file, or directory with --recursive.')
+    parser.add_argument('-o', '--output', help='Path to the output file, or output directory with --recursive. '
+                                               'If not provided, prints to console.')
     parser.add_argument('-i', '--in-place', action='store_true', 
                         help='Modify the input file directly (use with caution!).')
     parser.add_argument('-t', '--type', 
                         help='Force a specific file type (e.g., python, c_style, css, etc.). '
                              'By default, auto-detects based on file extension.')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='Process every supported file under the input directory in parallel.')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes to use with --recursive. '
+                             'Defaults to the number of CPUs.')
     parser.add_argument('-l', '--list-types', action='store_true', 
                         help='List all supported file types and exit.')
     parser.add_argument('-v', '--verbose', action='store_true', 
@@ -62,6 +100,8 @@ def main():
     in_place = args.in_place
     forced_type = args.type
     verbose = args.verbose
+    recursive = args.recursive
+    jobs = args.jobs
 
     if not os.path.exists(input_path):
         print(f"Error: Input file not found: {input_path}")
@@ -71,6 +111,33 @@ def main():
         print("Error: Cannot use --in-place (-i) and --output (-o) together.")
         return 1
 
+    if jobs < 1:
+        print("Error: --jobs (-j) must be at least 1.")
+        return 1
+
+    if os.path.isdir(input_path):
+        if not recursive:
+            print(f"Error: Input is a directory, use --recursive (-r) to process it: {input_path}")
+            return 1
+        return _process_tree(input_path, output_path, in_place, forced_type, verbose, jobs)
+
+    return _process_file(input_path, output_path, in_place, forced_type, verbose)
+
+
+def _process_file(input_path, output_path, in_place, forced_type, verbose):
+    """
+    Process the comments in a single file.
+    
+    Args:
+        input_path (str): Path to the input file.
+        output_path (str): Path to the output file, or None.
+        in_place (bool): Whether to modify the input file directly.
+        forced_type (str): The file type to force, or None to auto-detect.
+        verbose (bool): Whether to print file type detection details.
+        
+    Returns:
+        int: Exit code (0 for success, non-zero for failure).
+    """
     try:
         # Detect file type
         if forced_type and forced_type in COMMENT_PATTERNS:
@@ -87,56 +154,57 @@ def main():
                 print(f"Single-line comment: {patterns['single_line'] if patterns['single_line'] else 'None'}")
                 print(f"Multi-line comment: {patterns['multi_line'] if patterns['multi_line'] else 'None'}")
 
-        with open(input_path, 'r', encoding='utf-8') as f_in:
-            original_content = f_in.read()
+        original_content = _read_source(input_path)
+        if b'\0' in original_content:
+            print(f"Error: Input file appears to be binary: {input_path}")
+            return 1
 
         # Process the content with the detected or forced file type
         cleaned_content = process_comments(original_content, file_type, patterns)
 
         if in_place:
             # Create a unique backup just in case
-            base, ext = os.path.splitext(input_path)
-            backup_path = f"{base}.{int(time.time())}.bak"
-            # Fallback if needed
-            default_backup_path = input_path + '.bak'
-
-            chosen_backup_path = backup_path
-            if os.path.exists(chosen_backup_path):
-                 chosen_backup_path = default_backup_path # Use default if timestamped exists somehow
+            backup_path = f"{input_path}.{os.getpid()}.bak"
 
+            temp_path = None
             try:
-                 # Ensure backup doesn't overwrite another backup easily
-                if os.path.exists(chosen_backup_path):
-                    print(f"Warning: Backup file {chosen_backup_path} already exists. Overwriting.")
-                    # os.remove(chosen_backup_path) # Uncomment to force overwrite
+                # Hard-link the original as the backup so no data is copied
+                try:
+                    os.link(input_path, backup_path)
+                except FileExistsError:
+                    raise
+                except OSError:
+                    # Not every file system supports hard links
+                    shutil.copy2(input_path, backup_path)
+                print(f"Original file backed up to: {backup_path}")
 
-                os.rename(input_path, chosen_backup_path)
-                print(f"Original file backed up to: {chosen_backup_path}")
-
-                with open(input_path, 'w', encoding='utf-8') as f_out:
+                # Write a sibling temporary file and atomically swap it in, so
+                # the original is never left half-written
+                with tempfile.NamedTemporaryFile('wb', delete=False,
+                                                 dir=os.path.dirname(input_path) or '.') as f_out:
+                    temp_path = f_out.name
                     f_out.write(cleaned_content)
+                    f_out.flush()
+                    os.fsync(f_out.fileno())
+                shutil.copymode(input_path, temp_path)
+                os.replace(temp_path, input_path)
                 print(f"Comments processed in-place: {input_path}")
 
             except Exception as e:
                 print(f"Error during in-place modification: {e}")
-                # Attempt to restore backup if writing failed
-                if os.path.exists(chosen_backup_path) and not os.path.exists(input_path):
-                    os.rename(chosen_backup_path, input_path)
-                    print("Original file restored from backup.")
-                elif not os.path.exists(chosen_backup_path) and os.path.exists(default_backup_path) and not os.path.exists(input_path):
-                    # Try restoring default backup name if timestamped failed
-                    os.rename(default_backup_path, input_path)
-                    print("Original file restored from backup.")
+                # The original file is untouched, only clean up the partial write
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
                 return 1
 
         elif output_path:
-            with open(output_path, 'w', encoding='utf-8') as f_out:
+            with open(output_path, 'wb') as f_out:
                 f_out.write(cleaned_content)
             print(f"Processed file written to: {output_path}")
         else:
             # Print to console if no output or in-place flag specified
             print(f"\n--- Processed {file_type.upper()} file ---")
-            print(cleaned_content.strip()) # Strip trailing newline for cleaner console output
+            print(cleaned_content.decode('utf-8', errors='replace').strip()) # Strip trailing newline for cleaner console output
             print("----------------------\n")
 
         return 0
@@ -152,5 +220,88 @@ def main():
         return 1
 
 
+def _process_file_captured(job):
+    """
+    Process a single file in a worker, capturing what it prints.
+    
+    Args:
+        job (tuple): The arguments for _process_file().
+        
+    Returns:
+        tuple: The exit code and the captured output.
+    """
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        exit_code = _process_file(*job)
+    return exit_code, output.getvalue()
+
+
+def _process_tree(input_dir, output_dir, in_place, forced_type, verbose, jobs):
+    """
+    Process every supported file under a directory using a pool of worker processes.
+    
+    Unless a known file type is forced, files whose type cannot be detected
+    from their extension are skipped. Compiled Python files, __pycache__,
+    hidden directories such as .git and an output directory inside the
+    input directory are always skipped. Where possible the workers are
+    forked, so they share the comment patterns already compiled in this
+    process instead of compiling their own.
+    
+    Args:
+        input_dir (str): Path to the input directory.
+        output_dir (str): Directory to mirror the processed tree into, or None.
+        in_place (bool): Whether to modify the input files directly.
+        forced_type (str): The file type to force, or None to auto-detect.
+        verbose (bool): Whether to print file type detection details.
+        jobs (int): The number of worker processes; 1 processes files serially.
+        
+    Returns:
+        int: Exit code (0 if every file succeeded, non-zero otherwise).
+    """
+    # Output from an earlier run inside the tree must not be processed again
+    output_real = os.path.realpath(output_dir) if output_dir else None
+
+    tasks = []
+    for root, dirs, files in os.walk(input_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d not in _SKIPPED_DIRS
+                         and os.path.realpath(os.path.join(root, d)) != output_real)
+        for name in sorted(files):
+            input_path = os.path.join(root, name)
+            if os.path.splitext(name)[1].lower() in _BINARY_EXTENSIONS:
+                continue
+            if forced_type not in COMMENT_PATTERNS and detect_file_type(input_path)[0] == 'unknown':
+                continue
+
+            output_path = None
+            if output_dir:
+                output_path = os.path.join(output_dir, os.path.relpath(input_path, input_dir))
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            tasks.append((input_path, output_path, in_place, forced_type, verbose))
+
+    if not tasks:
+        print(f"No supported files found in: {input_dir}")
+        return 0
+
+    exit_code = 0
+    if jobs == 1 or len(tasks) == 1:
+        for task in tasks:
+            exit_code = _process_file(*task) or exit_code
+        return exit_code
+
+    # Fork is unavailable on Windows and unsafe on macOS; workers started
+    # there import the package and compile the patterns themselves
+    if 'fork' in multiprocessing.get_all_start_methods() and sys.platform != 'darwin':
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+
+    # Files are independent, so spread them over the workers
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    with context.Pool(jobs) as pool:
+        for file_exit_code, output in pool.imap(_process_file_captured, tasks, chunksize):
+            print(output, end='')
+            exit_code = exit_code or file_exit_code
+    return exit_code
+
+
 if __name__ == "__main__":
     exit(main())
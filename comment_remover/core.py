@@ -4,8 +4,11 @@ Core functionality for the comment remover.
 This module contains the main functions for detecting file types and removing comments.
 """
 
+import io
 import re
+import functools
 import mimetypes
+import tokenize
 from pathlib import Path
 
 # Dictionary of file types and their comment patterns
@@ -111,6 +114,441 @@ COMMENT_PATTERNS = {
 }
 
 
+# Collapses runs of blank lines, shared by every file type. The greedy \s*
+# backtracks to the last newline of the run, so no repeated group is needed.
+_COLLAPSE_RE = re.compile(r'\n\s*\n')
+_COLLAPSE_BYTES_RE = re.compile(rb'\n\s*\n')
+
+# Characters that str.splitlines() treats as line boundaries; bytes.splitlines()
+# only treats '\r' and '\n' as such
+_LINE_BREAKS = '\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+
+# Finds line boundaries other than a plain '\n'
+_OTHER_LINE_BREAKS_RE = re.compile(f'[{_LINE_BREAKS[1:]}]')
+
+# A PEP 263 encoding declaration, and the blank or comment-only line that
+# may come before one
+_CODING_COOKIE_RE = re.compile(r'[ \t\f]*#.*?coding[:=][ \t]*[-\w.]+')
+_CODING_COOKIE_BYTES_RE = re.compile(rb'[ \t\f]*#.*?coding[:=][ \t]*[-\w.]+')
+_BLANK_LINE_RE = re.compile(r'[ \t\f]*(?:[#\r\n]|$)')
+_BLANK_LINE_BYTES_RE = re.compile(rb'[ \t\f]*(?:[#\r\n]|$)')
+
+
+@functools.lru_cache(maxsize=None)
+def _single_line_tokenizer(single_line, string_literals, binary=False):
+    """
+    Build a regex that finds single-line comment markers outside string literals.
+    
+    The pattern alternates escaped quotes, string literals (which never span a
+    line break) and the comment marker, so a single finditer() pass over the
+    content skips everything inside strings. Only the comment alternative is
+    named, as 'comment', and it runs to the end of the line.
+    
+    Args:
+        single_line (str): The single-line comment marker.
+        string_literals (tuple): The string delimiters for the file type.
+        binary (bool, optional): Whether to build a bytes pattern. Defaults to False.
+        
+    Returns:
+        re.Pattern: The compiled tokenizer.
+    """
+    line_breaks = '\n\r' if binary else _LINE_BREAKS
+    quotes = ''.join(re.escape(quote) for quote in string_literals)
+    alternatives = [rf'\\[{quotes}\\]']
+    for quote in string_literals:
+        quote = re.escape(quote)
+        alternatives.append(rf'{quote}(?:\\[^{line_breaks}]|[^{quote}\\{line_breaks}])*{quote}?')
+    # Heuristic: a marker right after ':' is likely part of a URL protocol.
+    # The lookbehind sits after the marker's first character so that every
+    # alternative starts with a literal, which lets the regex engine jump
+    # straight to candidate positions instead of trying each character.
+    first, rest = re.escape(single_line[0]), re.escape(single_line[1:])
+    alternatives.append(f'(?P<comment>{first}(?<!:{first}){rest}[^{line_breaks}]*)')
+    pattern = '|'.join(alternatives)
+    return re.compile(pattern.encode('utf-8') if binary else pattern)
+
+
+def _scan_cuts(content, tokenizer):
+    """
+    Find the span of the single-line comment on each line.
+    
+    The content is scanned in one forward pass. Each comment match consumes
+    the rest of its line, so at most one span is reported per line and the
+    scan never looks at quotes inside a comment.
+    
+    Args:
+        content (str or bytes): The content to scan.
+        tokenizer (re.Pattern): The tokenizer from _single_line_tokenizer().
+        
+    Returns:
+        list: The (start, end) offsets of the comments, in ascending order.
+            Each end is the offset of the line break after the comment.
+    """
+    return [match.span() for match in tokenizer.finditer(content)
+            if match.lastgroup == 'comment']
+
+
+def _strip_paired(content, start_tok, end_tok, strip_unclosed=False):
+    """
+    Remove every block delimited by start_tok and end_tok from the content.
+    
+    Uses plain find() scans rather than a lazy regex, so the work stays
+    linear even when the content has many unmatched start tokens.
+    
+    Args:
+        content (str or bytes): The content to process.
+        start_tok (str or bytes): The token that opens a block.
+        end_tok (str or bytes): The token that closes a block.
+        strip_unclosed (bool, optional): Whether a block that is never closed
+            runs to the end of the content. Defaults to False, which keeps it.
+        
+    Returns:
+        str or bytes: The content with the delimited blocks removed.
+    """
+    parts = []
+    i = 0
+    while True:
+        start = content.find(start_tok, i)
+        if start == -1:
+            break
+        
+        end = content.find(end_tok, start + len(start_tok))
+        if end == -1:
+            if strip_unclosed:
+                parts.append(content[i:start])
+                i = len(content)
+            break
+        
+        # Keep the content before the block and skip past its end
+        parts.append(content[i:start])
+        i = end + len(end_tok)
+    
+    parts.append(content[i:])
+    return content[:0].join(parts)
+
+
+def _strip_triple_quotes(content, double_quotes='"""', single_quotes="'''"):
+    """
+    Remove every triple-quoted block, of either quote kind, in a single pass.
+    
+    Whichever kind of triple quote opens first wins, so a block of one kind
+    may contain the other. A block that is never closed is kept.
+    
+    Args:
+        content (str or bytes): The content to process.
+        double_quotes (str or bytes, optional): Three double quotes, of the
+            same type as the content.
+        single_quotes (str or bytes, optional): Three single quotes, of the
+            same type as the content.
+        
+    Returns:
+        str or bytes: The content with the triple-quoted blocks removed.
+    """
+    parts = []
+    i = 0
+    double = content.find(double_quotes)
+    single = content.find(single_quotes)
+    while double != -1 or single != -1:
+        if single == -1 or (double != -1 and double < single):
+            start, quote = double, double_quotes
+        else:
+            start, quote = single, single_quotes
+        
+        end = content.find(quote, start + 3)
+        if end == -1:
+            # Unclosed, and so is every later opener of the same kind
+            if quote == double_quotes:
+                double = -1
+            else:
+                single = -1
+            continue
+        
+        # Keep the content before the block and skip past its end
+        parts.append(content[i:start])
+        i = end + 3
+        
+        # Look again for any opener that fell inside the removed block
+        if -1 < double < i:
+            double = content.find(double_quotes, i)
+        if -1 < single < i:
+            single = content.find(single_quotes, i)
+    
+    parts.append(content[i:])
+    return content[:0].join(parts)
+
+
+def _normalize_line_breaks(content):
+    """
+    Normalise the line endings so that every line ends with '\\n'.
+    
+    Args:
+        content (str or bytes): The content to normalise.
+        
+    Returns:
+        str or bytes: The content with every line break replaced by '\\n'.
+    """
+    if isinstance(content, bytes):
+        if b'\r' in content:
+            content = b'\n'.join(content.splitlines())
+    elif _OTHER_LINE_BREAKS_RE.search(content):
+        content = '\n'.join(content.splitlines())
+    return content
+
+
+def _remove_spans(content, spans, replacements=None):
+    """
+    Remove the given spans, and the whitespace before each one on its line.
+    
+    Args:
+        content (str or bytes): The content, with '\\n' line endings only.
+        spans (list): Sorted, non-overlapping (start, end) offsets to remove.
+        replacements (dict, optional): Text to put in place of the spans that
+            start at the given offsets, keeping the whitespace before them.
+        
+    Returns:
+        str or bytes: The content with the spans removed.
+    """
+    newline = '\n' if isinstance(content, str) else b'\n'
+    
+    # Slices of the content kept around each span; the bound methods save an
+    # attribute lookup per span
+    kept = []
+    keep = kept.append
+    rfind = content.rfind
+    keep_start = 0
+    for start, end in spans:
+        if replacements and start in replacements:
+            keep(content[keep_start:start])
+            keep(replacements[start])
+        else:
+            line_start = max(rfind(newline, keep_start, start) + 1, keep_start)
+            keep(content[keep_start:line_start + len(content[line_start:start].rstrip())])
+        keep_start = end
+    keep(content[keep_start:])
+    
+    return content[:0].join(kept)
+
+
+def _coding_declaration_end(content):
+    """
+    Find the end of a PEP 263 encoding declaration on the first two lines.
+    
+    Args:
+        content (str or bytes): The Python source.
+        
+    Returns:
+        int: The offset just past the line holding the declaration, or 0 if
+            there is none.
+    """
+    if isinstance(content, bytes):
+        newline, cookie_re, blank_re = b'\n', _CODING_COOKIE_BYTES_RE, _BLANK_LINE_BYTES_RE
+    else:
+        newline, cookie_re, blank_re = '\n', _CODING_COOKIE_RE, _BLANK_LINE_RE
+    
+    line_start = 0
+    for _ in range(2):
+        line_end = content.find(newline, line_start) + 1 or len(content)
+        line = content[line_start:line_end]
+        if cookie_re.match(line):
+            return line_end
+        if not blank_re.match(line):
+            break
+        line_start = line_end
+    return 0
+
+
+def _strip_python(content):
+    """
+    Remove comments and docstrings from Python source using the tokenize module.
+    
+    A docstring here is any string literal that makes up a whole statement,
+    so triple-quoted strings that are assigned, passed or returned are kept.
+    f-strings run code and are never docstrings.
+    When every statement in a block is a docstring, the first becomes 'pass'
+    so the block is not left empty.
+    An encoding declaration is kept, as the source may not load without it.
+    
+    Args:
+        content (str or bytes): The Python source to process. Bytes are
+            decoded with the encoding that tokenize detects.
+        
+    Returns:
+        str or bytes: The source with comments and docstrings removed, or
+            None if it cannot be tokenized.
+    """
+    if isinstance(content, bytes):
+        try:
+            encoding, _ = tokenize.detect_encoding(io.BytesIO(content).readline)
+            stripped = _strip_python(content.decode(encoding))
+        except (SyntaxError, LookupError, UnicodeDecodeError):
+            return None
+        return None if stripped is None else stripped.encode(encoding)
+    
+    # Python only ends lines at '\n', '\r\n' and '\r'; form feeds and other
+    # Unicode line separators are ordinary characters in its source
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    
+    line_offsets = [0]
+    for line in content.split('\n'):
+        line_offsets.append(line_offsets[-1] + len(line) + 1)
+    
+    def offset(position):
+        row, col = position
+        return line_offsets[row - 1] + col
+    
+    # Bind the token types once, rather than looking them up on the module
+    # for every token
+    comment_token, nl_token, string_token = tokenize.COMMENT, tokenize.NL, tokenize.STRING
+    statement_ends = frozenset((tokenize.NEWLINE, tokenize.ENDMARKER))
+    statement_starts = frozenset((tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT))
+    indent_token, dedent_token = tokenize.INDENT, tokenize.DEDENT
+    
+    spans = []
+    add_span = spans.append
+    replacements = {}
+    # For each open indented block, whether it keeps any statement and where
+    # its first removed docstring starts
+    blocks = [[True, None]]
+    statement_start = True
+    string_run = None
+    try:
+        for token_type, token_string, start, end, _ in tokenize.generate_tokens(io.StringIO(content).readline):
+            if token_type == comment_token:
+                add_span((offset(start), offset(end)))
+                continue
+            if token_type == nl_token:
+                continue
+            
+            # Before Python 3.12 an f-string is a single STRING token, so
+            # its prefix is checked to keep it from counting as a docstring
+            if (token_type == string_token and (statement_start or string_run)
+                    and 'f' not in token_string[:token_string.find(token_string[-1])].lower()):
+                # Implicitly concatenated strings extend the same run
+                string_run = (string_run[0] if string_run else offset(start), offset(end))
+                statement_start = False
+                continue
+            
+            if string_run and token_type in statement_ends:
+                # The strings made up the whole statement
+                add_span(string_run)
+                if blocks[-1][1] is None:
+                    blocks[-1][1] = string_run[0]
+            elif token_type == indent_token:
+                blocks.append([False, None])
+            elif token_type == dedent_token:
+                kept, first_removed = blocks.pop()
+                if not kept and first_removed is not None:
+                    replacements[first_removed] = 'pass'
+            elif token_type not in statement_ends:
+                blocks[-1][0] = True
+            string_run = None
+            statement_start = token_type in statement_starts
+    except (tokenize.TokenError, SyntaxError):
+        return None
+    
+    # A comment that trails a docstring is found before the docstring ends
+    spans.sort()
+    declaration_end = _coding_declaration_end(content)
+    if declaration_end:
+        spans = [span for span in spans if span[0] >= declaration_end]
+    return _remove_spans(content, spans, replacements)
+
+
+def _strip_delimited(content, compiled):
+    """
+    Remove comments by matching the comment delimiters of the file type.
+    
+    Args:
+        content (str or bytes): The content to process.
+        compiled (dict): The strategies from _compile_patterns().
+        
+    Returns:
+        str or bytes: The content with comments removed.
+    """
+    # Process multi-line comments if the file type supports them
+    for strip_multi_line in compiled['multi']:
+        content = strip_multi_line(content)
+    
+    # Process single-line comments if the file type supports them
+    if compiled['single']:
+        content = _normalize_line_breaks(content)
+        
+        # A plain substring search rules out content without the marker
+        # before paying for the tokenizer; a full-line comment leaves a
+        # blank line
+        if compiled['marker'] in content:
+            content = _remove_spans(content, _scan_cuts(content, compiled['single']))
+    
+    return content
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_delimiters(file_type, single_line, multi_line, string_literals, binary):
+    """
+    Precompute the comment-removal strategies for a set of comment delimiters.
+    
+    Args:
+        file_type (str): The file type.
+        single_line (str): The single-line comment marker, or None.
+        multi_line (tuple): The multi-line comment delimiters, or None.
+        string_literals (tuple): The string delimiters.
+        binary (bool): Whether the strategies will process bytes.
+        
+    Returns:
+        dict: The language-aware stripper or None ('parse'), the multi-line
+            strippers to apply in order when it is absent or fails ('multi'),
+            the single-line marker ('marker') and tokenizer ('single') or None,
+            and the blank-line collapsing regex ('collapse').
+    """
+    def literal(token):
+        return token.encode('utf-8') if binary else token
+    
+    multi = []
+    if file_type == 'python':
+        # Special handling for Python triple quotes, both kinds in one pass
+        multi.append(functools.partial(_strip_triple_quotes, double_quotes=literal('"""'),
+                                       single_quotes=literal("'''")))
+    elif multi_line:
+        start_pattern, end_pattern = literal(multi_line[0]), literal(multi_line[1])
+        # C-style comments that are never closed run to the end of the file
+        multi.append(functools.partial(_strip_paired, start_tok=start_pattern, end_tok=end_pattern,
+                                       strip_unclosed=(start_pattern == literal('/*'))))
+    
+    marker = single = None
+    if single_line:
+        marker = literal(single_line)
+        single = _single_line_tokenizer(single_line, string_literals, binary)
+    
+    parse = _strip_python if file_type == 'python' else None
+    collapse = _COLLAPSE_BYTES_RE if binary else _COLLAPSE_RE
+    
+    return {'parse': parse, 'multi': tuple(multi), 'marker': marker, 'single': single,
+            'collapse': collapse}
+
+
+def _compile_patterns(file_type, patterns, binary=False):
+    """
+    Look up the comment-removal strategies for a file type and its patterns.
+    
+    Strategies are cached on the delimiters, so each set of delimiters is
+    only compiled the first time it is seen, including custom patterns and
+    entries of COMMENT_PATTERNS edited in place.
+    
+    Args:
+        file_type (str): The file type.
+        patterns (dict): The comment patterns.
+        binary (bool, optional): Whether the strategies will process bytes.
+            Defaults to False.
+        
+    Returns:
+        dict: The strategies, as returned by _compile_delimiters().
+    """
+    multi_line = tuple(patterns['multi_line']) if patterns['multi_line'] else None
+    return _compile_delimiters(file_type, patterns['single_line'], multi_line,
+                               tuple(patterns['string_literals']), binary)
+
+
 def detect_file_type(file_path):
     """
     Detect the file type based on extension or content.
@@ -124,9 +562,9 @@ def detect_file_type(file_path):
     ext = Path(file_path).suffix.lower()
     
     # First try to match by extension
-    for file_type, patterns in COMMENT_PATTERNS.items():
-        if ext in patterns['extensions']:
-            return file_type, patterns
+    match = _EXT_TO_TYPE.get(ext)
+    if match:
+        return match
     
     # If extension not found, try to use mimetype
     mime_type, _ = mimetypes.guess_type(file_path)
@@ -151,163 +589,53 @@ def process_comments(content, file_type=None, patterns=None):
     """
     Process comments in the given content based on the file type.
     
+    Comment syntax is ASCII for every supported language, so the content can
+    be given as undecoded bytes, which skips decoding the file entirely.
+    
     Args:
-        content (str): The content to process.
+        content (str or bytes): The content to process.
         file_type (str, optional): The file type. Defaults to None.
         patterns (dict, optional): The comment patterns. Defaults to None.
         
     Returns:
-        str: The processed content with comments removed.
+        str or bytes: The processed content with comments removed, of the
+            same type as the content.
     """
     if not patterns:
         # Default to C-style if no patterns provided
         patterns = COMMENT_PATTERNS['c_style']
     
-    # Process multi-line comments if the file type supports them
-    if patterns['multi_line']:
-        start_pattern, end_pattern = patterns['multi_line']
-        
-        # Handle different multi-line comment patterns
-        if start_pattern == '/*' and end_pattern == '*/':
-            # C-style comments - need to handle the special regex characters
-            # Use a more direct approach to find and remove C-style comments
-            i = 0
-            result = []
-            while i < len(content):
-                # Look for the start of a comment
-                start_idx = content.find('/*', i)
-                if start_idx == -1:
-                    # No more comments, add the rest of the content
-                    result.append(content[i:])
-                    break
-                
-                # Add the content before the comment
-                result.append(content[i:start_idx])
-                
-                # Find the end of the comment
-                end_idx = content.find('*/', start_idx)
-                if end_idx == -1:
-                    # Unclosed comment, treat the rest as a comment
-                    break
-                
-                # Skip past the end of the comment
-                i = end_idx + 2
-            
-            content = ''.join(result)
-        elif start_pattern == '<!--' and end_pattern == '-->':
-            # HTML/XML comments
-            content = re.sub(r'<!--.*?-->', '', content, flags=re.DOTALL)
-        elif start_pattern == '"""' and end_pattern == '"""':
-            # Python triple double quotes
-            content = re.sub(r'""".*?"""', '', content, flags=re.DOTALL)
-        elif start_pattern == "'''" and end_pattern == "'''":
-            # Python triple single quotes
-            content = re.sub(r"'''.*?'''", '', content, flags=re.DOTALL)
-        else:
-            # Generic handling for other multi-line comment formats
-            start_pattern_escaped = re.escape(start_pattern)
-            end_pattern_escaped = re.escape(end_pattern)
-            multiline_pattern = f"{start_pattern_escaped}.*?{end_pattern_escaped}"
-            multiline_comment_pattern = re.compile(multiline_pattern, re.DOTALL)
-            content = multiline_comment_pattern.sub('', content)
-    
-    # Special handling for Python triple quotes
-    if file_type == 'python':
-        # Handle triple single quotes
-        content = re.sub(r"'''.*?'''", '', content, flags=re.DOTALL)
-        # Handle triple double quotes
-        content = re.sub(r'""".*?"""', '', content, flags=re.DOTALL)
+    binary = isinstance(content, bytes)
+    newline = b'\n' if binary else '\n'
     
-    # Process single-line comments if the file type supports them
-    if patterns['single_line']:
-        processed_lines = []
-        single_line_pattern = patterns['single_line']
-        
-        for line in content.splitlines():
-            stripped_line = line.strip()
-            
-            # Check if the line IS ONLY a single-line comment (potentially indented)
-            if stripped_line and stripped_line.startswith(single_line_pattern):
-                # Replace the entire line with a blank line
-                processed_lines.append('')
-                continue
-            
-            # Check if the line CONTAINS a single-line comment after some code
-            try:
-                # Find all occurrences of the comment pattern
-                comment_indices = [i for i in range(len(line)) 
-                                  if line[i:i+len(single_line_pattern)] == single_line_pattern]
-                
-                if not comment_indices:
-                    # No comment pattern found
-                    processed_lines.append(line)
-                    continue
-                
-                # Find the first valid comment (not in a string)
-                valid_comment_index = -1
-                
-                for comment_index in comment_indices:
-                    # Skip if this is part of a string literal
-                    in_string = False
-                    string_char = None
-                    escaped = False
-                    
-                    for i in range(comment_index):
-                        char = line[i]
-                        
-                        # Handle escape sequences
-                        if escaped:
-                            escaped = False
-                            continue
-                        
-                        if char == '\\':
-                            escaped = True
-                            continue
-                        
-                        # Check for string literals
-                        if char in patterns['string_literals']:
-                            if not in_string:
-                                # Start of string
-                                in_string = True
-                                string_char = char
-                            elif char == string_char:
-                                # End of string
-                                in_string = False
-                                string_char = None
-                    
-                    # If we're not in a string at the comment position, it's a valid comment
-                    if not in_string:
-                        # Heuristic: Avoid replacing '//' if it looks like part of a URL protocol
-                        is_likely_url_protocol = False
-                        if comment_index > 0 and line[comment_index-1] == ':':
-                            is_likely_url_protocol = True
-                        
-                        if not is_likely_url_protocol:
-                            valid_comment_index = comment_index
-                            break
-                
-                if valid_comment_index >= 0:
-                    # Keep only the part *before* the comment, preserving trailing whitespace
-                    code_part = line[:valid_comment_index].rstrip()
-                    processed_lines.append(code_part)
-                else:
-                    # No valid comment found, keep the original line
-                    processed_lines.append(line)
-                continue
-            
-            except ValueError:
-                # No comment pattern found in the line, treat it as a regular code line
-                pass
-            
-            # If the line wasn't a full comment and didn't have a trailing comment removed,
-            # add the original line (whitespace included)
-            processed_lines.append(line)
-        
-        # Join the processed lines back together
-        content = '\n'.join(processed_lines)
+    # Strategies are cached on the delimiter values rather than on the
+    # patterns dict, so patterns edited in place are picked up
+    compiled = _compile_patterns(file_type, patterns, binary)
+    
+    # Python is lexed with the tokenize module when the source allows it
+    stripped = compiled['parse'](content) if compiled['parse'] else None
+    if stripped is None:
+        # Keep a Python encoding declaration, as bytes in other encodings
+        # do not load without it
+        head = _coding_declaration_end(content) if file_type == 'python' else 0
+        stripped = content[:head] + _strip_delimited(content[head:], compiled)
+    content = stripped
     
     # Collapse multiple consecutive blank lines into a maximum of one blank line
-    content = re.sub(r'\n(\s*\n)+', '\n\n', content)
+    content = compiled['collapse'].sub(newline * 2, content)
     
     # Ensure the file ends with a single newline for POSIX compatibility
-    return content.strip() + '\n'
+    return content.strip() + newline
+
+
+# Build the comment-removal strategies for each known file type once at
+# import, so they are cached before the first call and forked workers
+# inherit them
+for _file_type, _patterns in COMMENT_PATTERNS.items():
+    for _binary in (False, True):
+        _compile_patterns(_file_type, _patterns, _binary)
+
+# File type and comment patterns for each known extension, for O(1) detection
+_EXT_TO_TYPE = {ext: (file_type, patterns)
+                for file_type, patterns in COMMENT_PATTERNS.items()
+                for ext in patterns['extensions']}
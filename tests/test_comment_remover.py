@@ -3,15 +3,19 @@ Tests for the comment remover package.
 """
 
 import unittest
+import contextlib
+import io
 import os
 import tempfile
 import shutil
 import sys
+from unittest import mock
 
 # Add the parent directory to the path so we can import the package
 sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
 
 from comment_remover.core import process_comments, detect_file_type, COMMENT_PATTERNS
+from comment_remover import cli
 
 
 class TestCommentRemover(unittest.TestCase):
@@ -94,6 +98,108 @@ def main():
         self.assertIn("y = 10", result)
         self.assertIn("return 0", result)
 
+    def test_python_mixed_triple_quotes(self):
+        """Test Python docstrings that contain the other kind of triple quote"""
+        content = '''def main():
+    \'\'\'Mention """ in this docstring\'\'\'
+    x = 5
+    """Mention \'\'\' here"""
+    return x
+'''
+        result = process_comments(content, 'python', COMMENT_PATTERNS['python'])
+
+        # Check that docstrings are removed entirely
+        self.assertNotIn("Mention", result)
+
+        # Check that code is preserved
+        self.assertIn("def main():", result)
+        self.assertIn("x = 5", result)
+        self.assertIn("return x", result)
+
+    def test_python_string_literals_preserved(self):
+        """Test that Python triple-quoted strings that are not docstrings are kept"""
+        content = '''"""Module docstring"""
+QUERY = """
+SELECT * FROM users # not a comment
+"""
+def main():
+    "Function docstring"
+    return QUERY.strip()  # Return the query
+'''
+        result = process_comments(content, 'python', COMMENT_PATTERNS['python'])
+
+        # Check that docstrings and comments are removed
+        self.assertNotIn("Module docstring", result)
+        self.assertNotIn("Function docstring", result)
+        self.assertNotIn("# Return the query", result)
+
+        # Check that string literals are preserved
+        self.assertIn('QUERY = """\nSELECT * FROM users # not a comment\n"""', result)
+        self.assertIn("return QUERY.strip()\n", result)
+
+    def test_python_docstring_only_blocks(self):
+        """Test that a docstring that is the only statement in its block leaves valid Python"""
+        content = """class Error(Exception):
+    "An error."
+
+
+class Protocol:
+    def method(self):
+        \"\"\"Do something.\"\"\"  # Stub
+
+    def other(self):
+        \"\"\"Do something else.\"\"\"
+        return 1
+"""
+        result = process_comments(content, 'python', COMMENT_PATTERNS['python'])
+
+        # Check that the output still compiles
+        compile(result, '<test>', 'exec')
+        self.assertNotIn("An error.", result)
+        self.assertNotIn("Do something", result)
+        self.assertIn("    def method(self):\n        pass\n", result)
+        self.assertIn("        return 1\n", result)
+
+    def test_python_string_only_blocks(self):
+        """Test that a block made up only of docstrings is not left empty"""
+        content = """def function():
+    \"\"\"Doc.\"\"\"
+    "More text."
+
+x = 1
+"""
+        result = process_comments(content, 'python', COMMENT_PATTERNS['python'])
+
+        # Check that the output still compiles
+        compile(result, '<test>', 'exec')
+        self.assertEqual(result, "def function():\n    pass\n\nx = 1\n")
+
+    def test_python_fstrings_preserved(self):
+        """Test that f-string statements are kept, as they run code"""
+        content = """def generator():
+    f"{(yield)}"
+
+
+def report(value):
+    F'{print(value)}'  # Side effect
+"""
+        result = process_comments(content, 'python', COMMENT_PATTERNS['python'])
+
+        self.assertNotIn("# Side effect", result)
+        self.assertIn('    f"{(yield)}"\n', result)
+        self.assertIn("    F'{print(value)}'\n", result)
+
+    def test_python_invalid_source(self):
+        """Test that Python source that cannot be tokenized still has comments removed"""
+        content = """x = (1,  # Unclosed parenthesis
+'''Docstring'''
+"""
+        result = process_comments(content, 'python', COMMENT_PATTERNS['python'])
+
+        self.assertNotIn("# Unclosed parenthesis", result)
+        self.assertNotIn("Docstring", result)
+        self.assertIn("x = (1,", result)
+
     def test_html_comments(self):
         """Test HTML comments"""
         content = """<!DOCTYPE html>
@@ -159,6 +265,65 @@ UPDATE users SET name = 'John';"""
         self.assertIn("WHERE id = 1;", result)
         self.assertIn("UPDATE users SET name = 'John';", result)
 
+    def test_bytes_content(self):
+        """Test that bytes content is processed like str content and stays bytes"""
+        content = """-- Comment with non-ASCII text: café
+SELECT 'café -- not a comment' FROM menu; -- Trailing comment
+/* Multi-line
+   comment */
+"""
+        for file_type in ('sql', 'python', 'markup'):
+            patterns = COMMENT_PATTERNS[file_type]
+            expected = process_comments(content, file_type, patterns)
+            result = process_comments(content.encode('utf-8'), file_type, patterns)
+
+            self.assertIsInstance(result, bytes)
+            self.assertEqual(result, expected.encode('utf-8'))
+
+    def test_python_coding_declaration(self):
+        """Test that a Python encoding declaration survives so the bytes still load"""
+        content = b'# -*- coding: latin-1 -*-\nname = "caf\xe9"  # Comment\n'
+        result = process_comments(content, 'python', COMMENT_PATTERNS['python'])
+
+        # Check that the output still compiles and decodes the same way
+        namespace = {}
+        exec(compile(result, '<test>', 'exec'), namespace)
+        self.assertEqual(namespace['name'], 'caf\xe9')
+        self.assertNotIn(b"# Comment", result)
+
+        # Check that the declaration is also kept when tokenizing fails
+        content = b'#!/usr/bin/env python\n# coding: latin-1\nname = ("caf\xe9"  # Comment\n'
+        result = process_comments(content, 'python', COMMENT_PATTERNS['python'])
+
+        self.assertTrue(result.startswith(b'#!/usr/bin/env python\n# coding: latin-1\n'))
+        self.assertNotIn(b"# Comment", result)
+
+    def test_python_unicode_line_separators(self):
+        """Test that Python source keeps line separators that Python does not break lines on"""
+        content = b'# -*- coding: latin-1 -*-\nx = 1  # Wait\x85 still a comment\ns = "a\x85b\x0c"\n'
+        result = process_comments(content, 'python', COMMENT_PATTERNS['python'])
+
+        # Check that the whole comment goes and the string is unchanged
+        namespace = {}
+        exec(compile(result, '<test>', 'exec'), namespace)
+        self.assertEqual(namespace['s'], 'a\x85b\x0c')
+        self.assertNotIn(b"still a comment", result)
+
+    def test_patterns_edited_in_place(self):
+        """Test that editing a built-in pattern entry takes effect on the next call"""
+        patterns = COMMENT_PATTERNS['sql']
+        content = "SELECT 1; # Comment\n"
+        self.assertEqual(process_comments(content, 'sql', patterns), content)
+
+        original = patterns['single_line']
+        patterns['single_line'] = '#'
+        try:
+            result = process_comments(content, 'sql', patterns)
+        finally:
+            patterns['single_line'] = original
+
+        self.assertEqual(result, "SELECT 1;\n")
+
     def test_file_type_detection(self):
         """Test file type detection based on extension"""
         # Create test files with different extensions
@@ -211,6 +376,189 @@ const str = "This string contains // which is not a comment";
         self.assertIn('const protocol = "https://";', result)
         self.assertIn('const str = "This string contains // which is not a comment";', result)
 
+    def test_escaped_quotes_in_strings(self):
+        """Test that escaped quotes do not end a string literal early"""
+        content = """const a = "say \\"hi\\" // not a comment"; // comment
+const b = 'it\\'s // fine'; // another comment
+"""
+        result = process_comments(content, 'c_style', COMMENT_PATTERNS['c_style'])
+
+        # Check that comments are removed
+        self.assertNotIn("// comment", result)
+        self.assertNotIn("// another comment", result)
+
+        # Check that comment markers inside strings are preserved
+        self.assertIn('const a = "say \\"hi\\" // not a comment";', result)
+        self.assertIn("const b = 'it\\'s // fine';", result)
+
+
+class TestCommandLine(unittest.TestCase):
+    """Test cases for the command-line interface."""
+
+    def setUp(self):
+        """Set up a source tree to process."""
+        self.test_dir = tempfile.mkdtemp()
+        self.tree = os.path.join(self.test_dir, 'tree')
+        self.source = b"x = 1  # Comment\n"
+        self.compiled = b"\x00\x0d\x0d\x0a# not a comment\n\x00"
+        files = {
+            'main.py': self.source,
+            os.path.join('pkg', 'util.js'): b"var y = 2; // Comment\n",
+            os.path.join('pkg', '__pycache__', 'main.cpython-311.pyc'): self.compiled,
+            os.path.join('pkg', 'stale.pyc'): self.compiled,
+            os.path.join('.hidden', 'skip.py'): self.source,
+        }
+        for name, content in files.items():
+            path = os.path.join(self.tree, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        shutil.rmtree(self.test_dir)
+
+    def run_cli(self, *args):
+        """Run the command-line interface, returning its exit code and output."""
+        output = io.StringIO()
+        with mock.patch.object(sys, 'argv', ['comment-remover'] + list(args)):
+            with contextlib.redirect_stdout(output):
+                exit_code = cli.main()
+        return exit_code, output.getvalue()
+
+    def read(self, *parts):
+        """Read a file under the test directory as bytes."""
+        with open(os.path.join(self.test_dir, *parts), 'rb') as f:
+            return f.read()
+
+    def test_directory_requires_recursive(self):
+        """Test that a directory is only processed with --recursive"""
+        exit_code, output = self.run_cli(self.tree)
+
+        self.assertEqual(exit_code, 1)
+        self.assertIn("use --recursive", output)
+
+    def test_recursive_output_directory(self):
+        """Test that a tree is mirrored into an output directory"""
+        output_dir = os.path.join(self.test_dir, 'out')
+        exit_code, output = self.run_cli(self.tree, '-r', '-o', output_dir)
+
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(self.read('out', 'main.py'), b"x = 1\n")
+        self.assertEqual(self.read('out', 'pkg', 'util.js'), b"var y = 2;\n")
+        self.assertFalse(os.path.exists(os.path.join(output_dir, '.hidden')))
+        # Check that the workers' output reaches the console
+        self.assertEqual(output.count("Processed file written to"), 2)
+
+    def test_recursive_output_inside_input(self):
+        """Test that an output directory inside the input tree is not processed as input"""
+        output_dir = os.path.join(self.tree, 'out')
+        for _ in range(2):
+            exit_code, _ = self.run_cli(self.tree, '-r', '-o', output_dir)
+            self.assertEqual(exit_code, 0)
+
+        self.assertEqual(self.read('tree', 'out', 'main.py'), b"x = 1\n")
+        self.assertEqual(sorted(os.listdir(output_dir)), ['main.py', 'pkg'])
+
+    def test_recursive_forced_type(self):
+        """Test that a forced file type also picks up files of unknown type in a tree"""
+        with open(os.path.join(self.tree, 'notes.txt'), 'wb') as f:
+            f.write(self.source)
+        exit_code, _ = self.run_cli(self.tree, '-r', '-i', '-t', 'python')
+
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(self.read('tree', 'notes.txt'), b"x = 1\n")
+
+    def test_recursive_in_place(self):
+        """Test that a tree is processed in place, leaving hidden directories alone"""
+        exit_code, _ = self.run_cli(self.tree, '-r', '-i')
+
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(self.read('tree', 'main.py'), b"x = 1\n")
+        self.assertEqual(self.read('tree', 'pkg', 'util.js'), b"var y = 2;\n")
+        self.assertEqual(self.read('tree', '.hidden', 'skip.py'), self.source)
+
+    def test_in_place(self):
+        """Test that a file is replaced in place, keeping its permissions and a backup"""
+        path = os.path.join(self.tree, 'main.py')
+        os.chmod(path, 0o640)
+        exit_code, output = self.run_cli(path, '-i')
+
+        self.assertEqual(exit_code, 0)
+        self.assertIn("Comments processed in-place", output)
+        self.assertEqual(self.read('tree', 'main.py'), b"x = 1\n")
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+        # Check that the backup holds the original and no temporary file is left
+        backups = [name for name in os.listdir(self.tree) if name.endswith('.bak')]
+        self.assertEqual(len(backups), 1)
+        self.assertEqual(self.read('tree', backups[0]), self.source)
+        self.assertEqual(sorted(os.listdir(self.tree)), sorted(['.hidden', 'main.py', 'pkg'] + backups))
+
+    def test_in_place_backup_name(self):
+        """Test that in-place backups are named after the process and never overwritten"""
+        path = os.path.join(self.tree, 'main.py')
+        backup_name = f"main.py.{os.getpid()}.bak"
+        exit_code, output = self.run_cli(path, '-i')
+
+        self.assertEqual(exit_code, 0)
+        self.assertIn(f"backed up to: {os.path.join(self.tree, backup_name)}", output)
+        self.assertEqual(self.read('tree', backup_name), self.source)
+
+        # Check that a second run fails rather than replacing the first backup
+        exit_code, output = self.run_cli(path, '-i')
+
+        self.assertEqual(exit_code, 1)
+        self.assertIn("Error during in-place modification", output)
+        self.assertEqual(self.read('tree', backup_name), self.source)
+        self.assertEqual(self.read('tree', 'main.py'), b"x = 1\n")
+
+    def test_jobs(self):
+        """Test that a tree gives the same results serially and with a worker pool"""
+        for jobs in ('1', '2'):
+            output_dir = os.path.join(self.test_dir, 'out' + jobs)
+            exit_code, output = self.run_cli(self.tree, '-r', '-o', output_dir, '-j', jobs)
+
+            self.assertEqual(exit_code, 0)
+            self.assertEqual(self.read('out' + jobs, 'main.py'), b"x = 1\n")
+            self.assertEqual(self.read('out' + jobs, 'pkg', 'util.js'), b"var y = 2;\n")
+            # Check that the output is printed in file order
+            self.assertLess(output.index('main.py'), output.index('util.js'))
+
+        exit_code, output = self.run_cli(self.tree, '-r', '-j', '0')
+
+        self.assertEqual(exit_code, 1)
+        self.assertIn("must be at least 1", output)
+
+    def test_recursive_skips_compiled_files(self):
+        """Test that compiled Python files and __pycache__ are never processed"""
+        exit_code, _ = self.run_cli(self.tree, '-r', '-i', '-j', '1')
+
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(self.read('tree', 'pkg', '__pycache__', 'main.cpython-311.pyc'), self.compiled)
+        self.assertEqual(self.read('tree', 'pkg', 'stale.pyc'), self.compiled)
+        # Check that no backup was made beside them either
+        self.assertEqual(os.listdir(os.path.join(self.tree, 'pkg', '__pycache__')),
+                         ['main.cpython-311.pyc'])
+
+        output_dir = os.path.join(self.test_dir, 'out')
+        exit_code, _ = self.run_cli(self.tree, '-r', '-o', output_dir)
+
+        self.assertEqual(exit_code, 0)
+        self.assertFalse(os.path.exists(os.path.join(output_dir, 'pkg', '__pycache__')))
+        self.assertFalse(os.path.exists(os.path.join(output_dir, 'pkg', 'stale.pyc')))
+
+    def test_binary_file_rejected(self):
+        """Test that content with NUL bytes is rejected rather than processed"""
+        path = os.path.join(self.tree, 'binary.py')
+        with open(path, 'wb') as f:
+            f.write(self.compiled)
+        exit_code, output = self.run_cli(path, '-i')
+
+        self.assertEqual(exit_code, 1)
+        self.assertIn("appears to be binary", output)
+        self.assertEqual(self.read('tree', 'binary.py'), self.compiled)
+        self.assertFalse(os.path.exists(f"{path}.{os.getpid()}.bak"))
+
 
 if __name__ == '__main__':
     unittest.main()